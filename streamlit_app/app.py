@@ -10,6 +10,7 @@ from pathlib import Path
 # Import utilities
 from utils.calculations import (
     load_and_prepare_data,
+    build_uplift_data,
     calculate_decile_stats,
     calculate_portfolio_profit,
     calculate_spray_and_pray,
@@ -49,9 +50,9 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """Load and cache the data."""
+    """Load and cache the uplift arrays (shared, read-only)."""
     # Try relative paths only (portable)
     paths = [
         Path("data/test_results_with_uplift.csv"),
@@ -60,61 +61,30 @@ def load_data():
     
     for path in paths:
         if path.exists():
-            return load_and_prepare_data(str(path))
+            return build_uplift_data(load_and_prepare_data(str(path)))
     
     st.error("Data file not found! Please ensure test_results_with_uplift.csv is in the data folder.")
     st.stop()
 
 
-def main():
-    # Load data
-    df = load_data()
-    decile_stats = calculate_decile_stats(df)
-    
-    # ========== SIDEBAR ==========
-    st.sidebar.title("🎯 Model Auditor")
-    
-    # Business Parameters
-    st.sidebar.header("💰 Business Parameters")
-    email_cost = st.sidebar.slider(
-        "Email Cost ($)",
-        min_value=0.01,
-        max_value=1.00,
-        value=0.10,
-        step=0.01,
-        format="$%.2f"
-    )
-    
-    profit_per_conversion = st.sidebar.slider(
-        "Profit per Conversion ($)",
-        min_value=5.0,
-        max_value=100.0,
-        value=25.0,
-        step=1.0,
-        format="$%.0f"
-    )
-    
-    # Targeting
-    st.sidebar.header("🎯 Targeting")
-    target_pct = st.sidebar.slider(
-        "Target % of Selected Pool",
-        min_value=10,
-        max_value=100,
-        value=90,
-        step=5,
-        format="%d%%"
-    ) / 100
+@st.fragment
+def _results_panel(data, decile_stats, target_pct, email_cost, profit_per_conversion):
+    """
+    Decile audit controls plus impact panel, KPIs, charts and decile table.
     
-    # Decile Audit
-    st.sidebar.header("🔧 Decile Audit")
+    Run as a fragment: toggling a decile reruns only this region, not the
+    whole script. Sidebar sliders still trigger a full rerun.
+    """
+    # ========== DECILE AUDIT ==========
+    st.markdown("#### 🔧 Decile Audit")
     
     # Initialize session state for deciles (before buttons)
     for i in range(1, 11):
         if f'decile_{i}' not in st.session_state:
             st.session_state[f'decile_{i}'] = True
     
-    # Quick action buttons (one-shot actions)
-    col1, col2 = st.sidebar.columns(2)
+    # Quick action buttons (one-shot actions) and pool size badge
+    col1, col2, col3 = st.columns([1, 1, 3])
     if col1.button("Exclude D9", type="secondary"):
         # One-shot: just set D9 to False, don't create sticky state
         st.session_state['decile_9'] = False
@@ -122,13 +92,12 @@ def main():
         for i in range(1, 11):
             st.session_state[f'decile_{i}'] = True
     
-    # Decile checkboxes in two columns
-    st.sidebar.write("Select deciles to include:")
-    dcol1, dcol2 = st.sidebar.columns(2)
+    # Decile checkboxes in one row, highest uplift first
+    st.write("Select deciles to include:")
+    decile_cols = st.columns(10)
     
     selected_deciles = []
-    for i in range(10, 0, -1):
-        col = dcol1 if i > 5 else dcol2
+    for col, i in zip(decile_cols, range(10, 0, -1)):
         label = f"D{i}"
         if i == 9:
             label += " (!)"  # ASCII warning for portability
@@ -141,55 +110,25 @@ def main():
         if checked:
             selected_deciles.append(i)
     
-    # Pool size badge
-    pool_df = df[df['decile'].isin(selected_deciles)]
-    st.sidebar.metric("Selected Pool", f"{len(pool_df):,} customers")
-    
-    # Narrative expanders
-    st.sidebar.markdown("---")
-    with st.sidebar.expander("❓ What is Decile 9?"):
-        st.markdown("""
-        **Decile 9** contains "Sure Things" — customers with **high baseline conversion** 
-        but **low incremental lift**. They buy regardless of email.
-        
-        The T-Learner over-indexes on them because it sees high treatment conversion, 
-        not realizing these customers convert anyway.
-        """)
-    
-    with st.sidebar.expander("🔪 Portfolio Surgery"):
-        st.markdown("""
-        Instead of using a strict ranking cutoff, we can **surgically exclude** 
-        unprofitable segments like Decile 9.
-        
-        This demonstrates the value of **human-in-the-loop auditing** of ML models.
-        """)
-    
-    with st.sidebar.expander("🛡️ Production Guardrails"):
-        st.markdown("""
-        In production, implement:
-        - **Safety Cap**: Limit targeting of high-loyalty segments
-        - **Exploration Group**: 5% holdout to monitor if excluded segments become persuadable
-        """)
-    
-    # ========== MAIN PANEL ==========
-    st.title("🎯 The Persuadable Hunter")
-    st.markdown("### Uplift Model Auditor — Human-in-the-Loop Targeting")
+    pool_size = decile_stats.loc[decile_stats['decile'].isin(selected_deciles), 'n_customers'].sum()
+    col3.metric("Selected Pool", f"{pool_size:,} customers")
     
     # Calculate all metrics
-    all_deciles = list(range(1, 11))
+    all_deciles = tuple(range(1, 11))
+    selected_key = tuple(sorted(selected_deciles))
     
     # Before (all deciles)
     before_result = calculate_portfolio_profit(
-        df, all_deciles, target_pct, email_cost, profit_per_conversion
+        data, all_deciles, target_pct, email_cost, profit_per_conversion
     )
     
     # After (selected deciles)
     after_result = calculate_portfolio_profit(
-        df, selected_deciles, target_pct, email_cost, profit_per_conversion
+        data, selected_key, target_pct, email_cost, profit_per_conversion
     )
     
     # Spray & Pray baseline
-    spray_result = calculate_spray_and_pray(df, email_cost, profit_per_conversion)
+    spray_result = calculate_spray_and_pray(decile_stats, email_cost, profit_per_conversion)
     
     # ========== TOGGLE IMPACT PANEL (THE "AHA!" MOMENT) ==========
     delta = after_result['profit'] - before_result['profit']
@@ -267,10 +206,10 @@ def main():
         st.markdown("#### ROI Curve: Strict Ranking vs Portfolio Surgery")
         
         strict_curve = calculate_profit_curve(
-            df, all_deciles, email_cost, profit_per_conversion
+            data, all_deciles, email_cost, profit_per_conversion
         )
         filtered_curve = calculate_profit_curve(
-            df, selected_deciles, email_cost, profit_per_conversion
+            data, selected_key, email_cost, profit_per_conversion
         )
         
         fig_roi = build_roi_curve(strict_curve, filtered_curve, spray_result['profit'])
@@ -281,17 +220,16 @@ def main():
         st.markdown("#### Decile Profitability")
         
         decile_profits = calculate_decile_profits(decile_stats, email_cost, profit_per_conversion)
-        fig_bars = build_decile_bars(decile_profits, selected_deciles)
-        st.plotly_chart(fig_bars, width='stretch')
+        fig_bars = build_decile_bars(decile_profits, selected_key)
+        st.altair_chart(fig_bars, width='stretch')
     
     # ========== DECILE SUMMARY TABLE ==========
     st.markdown("---")
     st.markdown("#### Decile Summary")
     
     # Add status column
-    decile_profits['status'] = decile_profits.apply(
-        lambda row: "✅ Included" if row['decile'] in selected_deciles else "❌ Excluded",
-        axis=1
+    decile_profits['status'] = np.where(
+        decile_profits['decile'].isin(selected_deciles), "✅ Included", "❌ Excluded"
     )
     
     # Format for display
@@ -301,14 +239,13 @@ def main():
                           'Lift (pp)', 'Profit ($)', 'Status']
     
     # Style the dataframe
-    def highlight_d9(row):
-        if row['Decile'] == 9:
-            return ['background-color: #f8d7da'] * len(row)
-        elif row['Decile'] in selected_deciles and row['Profit ($)'] > 0:
-            return ['background-color: #d4edda'] * len(row)
-        return [''] * len(row)
-    
-    styled_df = display_df.style.apply(highlight_d9, axis=1).format({
+    def highlight_d9(df):
+        styles = pd.DataFrame('', index=df.index, columns=df.columns)
+        styles.loc[df['Decile'].isin(selected_deciles) & (df['Profit ($)'] > 0), :] = 'background-color: #d4edda'
+        styles.loc[df['Decile'] == 9, :] = 'background-color: #f8d7da'  # D9 takes precedence
+        return styles
+    
+    styled_df = display_df.style.apply(highlight_d9, axis=None).format({
         'Control %': '{:.2f}',
         'Treatment %': '{:.2f}',
         'Lift (pp)': '{:+.2f}',
@@ -316,6 +253,78 @@ def main():
     })
     
     st.dataframe(styled_df, width='stretch', hide_index=True)
+
+
+def main():
+    # Load data
+    data = load_data()
+    decile_stats = calculate_decile_stats(data)
+    
+    # ========== SIDEBAR ==========
+    st.sidebar.title("🎯 Model Auditor")
+    
+    # Business Parameters
+    st.sidebar.header("💰 Business Parameters")
+    email_cost = st.sidebar.slider(
+        "Email Cost ($)",
+        min_value=0.01,
+        max_value=1.00,
+        value=0.10,
+        step=0.01,
+        format="$%.2f"
+    )
+    
+    profit_per_conversion = st.sidebar.slider(
+        "Profit per Conversion ($)",
+        min_value=5.0,
+        max_value=100.0,
+        value=25.0,
+        step=1.0,
+        format="$%.0f"
+    )
+    
+    # Targeting
+    st.sidebar.header("🎯 Targeting")
+    target_pct = st.sidebar.slider(
+        "Target % of Selected Pool",
+        min_value=10,
+        max_value=100,
+        value=90,
+        step=5,
+        format="%d%%"
+    ) / 100
+    
+    # Narrative expanders
+    st.sidebar.markdown("---")
+    with st.sidebar.expander("❓ What is Decile 9?"):
+        st.markdown("""
+        **Decile 9** contains "Sure Things" — customers with **high baseline conversion** 
+        but **low incremental lift**. They buy regardless of email.
+        
+        The T-Learner over-indexes on them because it sees high treatment conversion, 
+        not realizing these customers convert anyway.
+        """)
+    
+    with st.sidebar.expander("🔪 Portfolio Surgery"):
+        st.markdown("""
+        Instead of using a strict ranking cutoff, we can **surgically exclude** 
+        unprofitable segments like Decile 9.
+        
+        This demonstrates the value of **human-in-the-loop auditing** of ML models.
+        """)
+    
+    with st.sidebar.expander("🛡️ Production Guardrails"):
+        st.markdown("""
+        In production, implement:
+        - **Safety Cap**: Limit targeting of high-loyalty segments
+        - **Exploration Group**: 5% holdout to monitor if excluded segments become persuadable
+        """)
+    
+    # ========== MAIN PANEL ==========
+    st.title("🎯 The Persuadable Hunter")
+    st.markdown("### Uplift Model Auditor — Human-in-the-Loop Targeting")
+    
+    _results_panel(data, decile_stats, target_pct, email_cost, profit_per_conversion)
     
     # ========== FOOTER ==========
     st.markdown("---")
@@ -2,61 +2,180 @@
 Calculation utilities for the Model Auditor Streamlit app.
 Handles profit calculations with counterfactual projection.
 """
+import functools
+from dataclasses import dataclass
+
 import pandas as pd
 import numpy as np
+import polars as pl
+import streamlit as st
+from numba import njit
+
+
+@dataclass(frozen=True, eq=False)
+class UpliftData:
+    """
+    Struct-of-arrays view of the scored test set, sorted by uplift score
+    (highest first), so the top-N of any decile pool is a prefix.
+    
+    decile_masks[d - 1] is the boolean row mask of decile d.
+    Instances hash by identity so they can key lru_cache lookups.
+    """
+    decile: np.ndarray
+    treatment: np.ndarray
+    y_true: np.ndarray
+    decile_masks: np.ndarray
+
+
+# Data comes from a cache_resource loader, so identity is a stable, O(1) cache key
+_HASH_BY_ID = {UpliftData: id}
+
+
+_COLUMN_DTYPES = {
+    'treatment': pl.Int8,
+    'y_true': pl.Float32
+}
 
 
 def load_and_prepare_data(filepath: str) -> pd.DataFrame:
-    """Load data and create robust decile assignment."""
-    df = pd.read_csv(filepath)
+    """
+    Load data, create robust decile assignment and order rows by
+    descending uplift rank.
+    """
+    # Downcast on read: 0/1 treatment and labels are exact in int8/float32.
+    # uplift_score stays float64, since ranking needs its full precision
+    df = pl.read_csv(filepath, schema_overrides=_COLUMN_DTYPES).to_pandas()
     
     # Robust decile assignment using rank (Codex fix)
-    # Forces exactly 10 bins even with ties
-    df['decile'] = pd.qcut(
-        df['uplift_score'].rank(method='first'),
-        q=10, labels=False
-    ) + 1
+    # Forces exactly 10 bins even with ties: ordinal ranks from one stable
+    # argsort, binned with the integer form of pd.qcut(rank(method='first'), q=10)
+    n = len(df)
+    order = np.argsort(df['uplift_score'].to_numpy(), kind='stable')
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n)
+    df['decile'] = np.maximum((ranks * 10 + n - 2) // (n - 1), 1).astype(np.int8)
     
-    return df
+    # Reuse the same argsort for targeting order (highest rank first), so
+    # the top-N of any pool is a prefix and nothing is ever sorted again
+    return df.iloc[order[::-1]]
 
 
-def calculate_decile_stats(df: pd.DataFrame) -> pd.DataFrame:
-    """Calculate per-decile statistics."""
-    stats = []
+def build_uplift_data(df: pd.DataFrame) -> UpliftData:
+    """
+    Extract the columns used by profit calculations as numpy arrays.
+    Expects the frame from load_and_prepare_data, already in targeting order.
+    """
+    decile = df['decile'].to_numpy(dtype=np.int8)
     
-    for decile in range(1, 11):
-        subset = df[df['decile'] == decile]
-        treated = subset[subset['treatment'] == 1]
-        control = subset[subset['treatment'] == 0]
-        
-        n_total = len(subset)
-        n_treated = len(treated)
-        n_control = len(control)
-        
-        if n_treated > 0 and n_control > 0:
-            treat_rate = treated['y_true'].mean()
-            ctrl_rate = control['y_true'].mean()
-            uplift_rate = treat_rate - ctrl_rate
+    return UpliftData(
+        decile=decile,
+        treatment=df['treatment'].to_numpy(dtype=np.int8),
+        y_true=df['y_true'].to_numpy(dtype=np.float32),
+        decile_masks=np.stack([decile == d for d in range(1, 11)])
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _pool_arrays(data: UpliftData, selected: frozenset) -> tuple:
+    """
+    Treatment and y_true arrays for the rows in the selected deciles,
+    still in descending uplift order.
+    
+    There are only 2^10 decile subsets, so each pool is built once per
+    data load and re-toggling a decile is free.
+    """
+    # OR together precomputed decile masks instead of a per-row isin lookup
+    rows = np.array(sorted(selected), dtype=np.int64) - 1
+    pool = np.logical_or.reduce(data.decile_masks[rows], axis=0)
+    return data.treatment[pool], data.y_true[pool]
+
+
+@njit(cache=True)
+def _profit_core(treat_arr, y_arr, target_pct, email_cost, profit_per_conversion):
+    """
+    Numeric core of calculate_portfolio_profit.
+    
+    Arrays hold the selected pool, sorted by uplift score (descending).
+    Returns (profit, revenue, cost, incremental_conversions, emails_sent,
+    pool_size).
+    """
+    pool_size = treat_arr.shape[0]
+    
+    if pool_size == 0:
+        return 0.0, 0.0, 0.0, 0.0, 0, 0
+    
+    # Target top X% of selected pool
+    n_target = int(pool_size * target_pct)
+    if n_target == 0:
+        n_target = 1
+    
+    # Single scan over the top-N rows of the pool
+    n_treat = 0
+    n_ctrl = 0
+    sum_treat_y = 0.0
+    sum_ctrl_y = 0.0
+    for i in range(n_target):
+        if treat_arr[i] == 1:
+            n_treat += 1
+            sum_treat_y += y_arr[i]
         else:
-            treat_rate = ctrl_rate = uplift_rate = 0
-        
-        stats.append({
-            'decile': decile,
-            'n_customers': n_total,
-            'n_treated': n_treated,
-            'n_control': n_control,
-            'treatment_rate': treat_rate * 100,
-            'control_rate': ctrl_rate * 100,
-            'observed_lift': uplift_rate * 100,
-            'uplift_rate': uplift_rate  # Keep raw for calculations
-        })
+            n_ctrl += 1
+            sum_ctrl_y += y_arr[i]
     
-    return pd.DataFrame(stats)
+    if n_treat > 0 and n_ctrl > 0:
+        uplift_rate = sum_treat_y / n_treat - sum_ctrl_y / n_ctrl
+        incr_conv = uplift_rate * n_target  # Project to all targeted
+    else:
+        incr_conv = 0.0
+    
+    cost = n_target * email_cost
+    revenue = incr_conv * profit_per_conversion
+    profit = revenue - cost
+    
+    return profit, revenue, cost, incr_conv, n_target, pool_size
+
+
+# Warm the JIT cache at import so the first rerun doesn't pay compilation
+_profit_core(np.ones(1, dtype=np.int8), np.zeros(1, dtype=np.float32), 1.0, 0.0, 0.0)
+
+
+@st.cache_data(hash_funcs=_HASH_BY_ID)
+def calculate_decile_stats(data: UpliftData) -> pd.DataFrame:
+    """Calculate per-decile statistics."""
+    # Deciles are bounded 1-10, so bincount replaces a hashed groupby
+    d = data.decile - 1
+    t = data.treatment.astype(np.float64)
+    y = data.y_true
+    
+    n_treated = np.bincount(d, weights=t, minlength=10)
+    n_control = np.bincount(d, weights=1 - t, minlength=10)
+    sum_treat_y = np.bincount(d, weights=y * t, minlength=10)
+    sum_ctrl_y = np.bincount(d, weights=y * (1 - t), minlength=10)
+    
+    # Rates are only meaningful when both arms are present
+    has_both = (n_treated > 0) & (n_control > 0)
+    treat_rate = np.where(has_both, sum_treat_y / np.maximum(n_treated, 1), 0)
+    ctrl_rate = np.where(has_both, sum_ctrl_y / np.maximum(n_control, 1), 0)
+    uplift_rate = treat_rate - ctrl_rate
+    
+    return pd.DataFrame({
+        'decile': np.arange(1, 11),
+        'n_customers': (n_treated + n_control).astype(np.int64),
+        'n_treated': n_treated.astype(np.int64),
+        'n_control': n_control.astype(np.int64),
+        'treated_conversions': sum_treat_y,
+        'control_conversions': sum_ctrl_y,
+        'treatment_rate': treat_rate * 100,
+        'control_rate': ctrl_rate * 100,
+        'observed_lift': uplift_rate * 100,
+        'uplift_rate': uplift_rate  # Keep raw for calculations
+    })
 
 
+@st.cache_data(hash_funcs=_HASH_BY_ID)
 def calculate_portfolio_profit(
-    df: pd.DataFrame,
-    selected_deciles: list,
+    data: UpliftData,
+    selected_deciles: tuple,
     target_pct: float,
     email_cost: float,
     profit_per_conversion: float
@@ -68,8 +187,8 @@ def calculate_portfolio_profit(
     then project to ALL targeted customers.
     
     Args:
-        df: DataFrame with decile, treatment, y_true columns
-        selected_deciles: List of deciles to include (1-10)
+        data: UpliftData arrays, sorted by uplift score (descending)
+        selected_deciles: Sorted tuple of deciles to include (1-10)
         target_pct: Percentage of selected pool to target (0-1)
         email_cost: Cost per email
         profit_per_conversion: Profit per conversion
@@ -77,48 +196,11 @@ def calculate_portfolio_profit(
     Returns:
         dict with profit metrics
     """
-    # Filter to selected deciles
-    pool = df[df['decile'].isin(selected_deciles)].copy()
-    pool_size = len(pool)
-    
-    if pool_size == 0:
-        return {
-            'profit': 0,
-            'revenue': 0,
-            'cost': 0,
-            'incremental_conversions': 0,
-            'emails_sent': 0,
-            'pool_size': 0
-        }
-    
-    # Sort by uplift score within selected pool
-    pool = pool.sort_values('uplift_score', ascending=False)
-    
-    # Target top X% of selected pool
-    n_target = int(pool_size * target_pct)
-    if n_target == 0:
-        n_target = 1
-    
-    targeted = pool.head(n_target)
+    treat, y = _pool_arrays(data, frozenset(selected_deciles))
     
-    # Calculate uplift rate from targeted subset
-    treated = targeted[targeted['treatment'] == 1]
-    control = targeted[targeted['treatment'] == 0]
-    
-    n_treated = len(treated)
-    n_control = len(control)
-    
-    if n_treated > 0 and n_control > 0:
-        treat_rate = treated['y_true'].mean()
-        ctrl_rate = control['y_true'].mean()
-        uplift_rate = treat_rate - ctrl_rate
-        incr_conv = uplift_rate * n_target  # Project to all targeted
-    else:
-        incr_conv = 0
-    
-    cost = n_target * email_cost
-    revenue = incr_conv * profit_per_conversion
-    profit = revenue - cost
+    profit, revenue, cost, incr_conv, n_target, pool_size = _profit_core(
+        treat, y, target_pct, email_cost, profit_per_conversion
+    )
     
     return {
         'profit': profit,
@@ -130,22 +212,24 @@ def calculate_portfolio_profit(
     }
 
 
+@st.cache_data
 def calculate_spray_and_pray(
-    df: pd.DataFrame,
+    decile_stats: pd.DataFrame,
     email_cost: float,
     profit_per_conversion: float
 ) -> dict:
     """
     Calculate profit for Spray & Pray (email everyone).
     This is the baseline: all deciles, 100% of population.
-    """
-    n_total = len(df)
     
-    treated = df[df['treatment'] == 1]
-    control = df[df['treatment'] == 0]
+    Uses the per-decile arm totals, so no pass over the raw data is needed.
+    """
+    n_treated = decile_stats['n_treated'].sum()
+    n_control = decile_stats['n_control'].sum()
+    n_total = int(n_treated + n_control)
     
-    treat_rate = treated['y_true'].mean()
-    ctrl_rate = control['y_true'].mean()
+    treat_rate = decile_stats['treated_conversions'].sum() / n_treated
+    ctrl_rate = decile_stats['control_conversions'].sum() / n_control
     uplift_rate = treat_rate - ctrl_rate
     
     incr_conv = uplift_rate * n_total
@@ -162,9 +246,10 @@ def calculate_spray_and_pray(
     }
 
 
+@st.cache_data(hash_funcs=_HASH_BY_ID)
 def calculate_profit_curve(
-    df: pd.DataFrame,
-    selected_deciles: list,
+    data: UpliftData,
+    selected_deciles: tuple,
     email_cost: float,
     profit_per_conversion: float,
     n_points: int = 20
@@ -172,17 +257,43 @@ def calculate_profit_curve(
     """
     Calculate profit at different targeting percentages for selected deciles.
     Returns data for ROI curve chart.
+    
+    Every point targets a prefix of the same sorted pool, so running
+    treated/control sums let the whole curve be evaluated as one
+    vectorized lookup over the 20 target sizes.
     """
-    percentages = []
-    profits = []
+    t, y = _pool_arrays(data, frozenset(selected_deciles))
+    t = t.astype(np.int32)
+    pool_size = len(t)
+    
+    cum_t = t.cumsum()
+    cum_c = (1 - t).cumsum()
+    cum_ty = (y * t).cumsum()
+    cum_cy = (y * (1 - t)).cumsum()
     
-    for pct_int in range(5, 105, 5):
-        pct = pct_int / 100
-        result = calculate_portfolio_profit(
-            df, selected_deciles, pct, email_cost, profit_per_conversion
+    pcts = np.arange(5, 105, 5)
+    
+    if pool_size == 0:
+        profits = np.zeros(len(pcts))
+    else:
+        n_targets = np.maximum((pool_size * (pcts / 100)).astype(np.int64), 1)
+        idx = n_targets - 1
+        
+        n_treated = cum_t[idx]
+        n_control = cum_c[idx]
+        
+        treat_rates = cum_ty[idx] / np.maximum(n_treated, 1)
+        ctrl_rates = cum_cy[idx] / np.maximum(n_control, 1)
+        incr_conv = np.where(
+            (n_treated > 0) & (n_control > 0),
+            (treat_rates - ctrl_rates) * n_targets,
+            0
         )
-        percentages.append(pct_int)
-        profits.append(result['profit'])
+        
+        profits = incr_conv * profit_per_conversion - n_targets * email_cost
+    
+    percentages = pcts.tolist()
+    profits = profits.tolist()
     
     # Find optimal
     optimal_idx = np.argmax(profits)
@@ -195,6 +306,7 @@ def calculate_profit_curve(
     }
 
 
+@st.cache_data
 def calculate_decile_profits(
     decile_stats: pd.DataFrame,
     email_cost: float,
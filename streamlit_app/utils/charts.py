@@ -1,11 +1,16 @@
 """
 Chart utilities for the Model Auditor Streamlit app.
-Creates Plotly charts for ROI curves and decile profitability.
+Creates the Plotly ROI curve and the Altair decile profitability chart.
 """
+import altair as alt
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import streamlit as st
 
 
+# Figures are cached as shared objects: callers must not mutate them
+@st.cache_resource(max_entries=32)
 def build_roi_curve(
     strict_curve: dict,
     filtered_curve: dict,
@@ -95,113 +100,90 @@ def build_roi_curve(
     return fig
 
 
+@st.cache_resource(max_entries=32)
 def build_decile_bars(
     decile_profits: pd.DataFrame,
-    selected_deciles: list
-) -> go.Figure:
+    selected_deciles: tuple
+) -> alt.LayerChart:
     """
     Build decile profitability bar chart with color coding.
     
+    Rendered with Altair: a 10-bar chart doesn't need Plotly's payload.
+    
     Colors:
     - Green: Profitable and selected
     - Red: Decile 9 (highlighted as the "Loyalty Tax")
     - Gray: Unprofitable
     - Faded: Excluded deciles
     """
-    df = decile_profits.copy()
+    df = decile_profits[['decile', 'profit', 'observed_lift', 'n_customers']].copy()
+    
+    # Assign colors (precedence: excluded, D9, profitable, unprofitable)
+    deciles = df['decile'].to_numpy()
+    is_selected = np.isin(deciles, list(selected_deciles))
+    is_d9 = deciles == 9
+    is_profitable = df['profit'].to_numpy() > 0
+    
+    df['color'] = np.select(
+        [~is_selected, is_d9, is_profitable],
+        ['#bdc3c7', '#e74c3c', '#27ae60'],  # Light gray excluded, red D9, green profitable
+        default='#95a5a6'  # Gray for unprofitable
+    )
+    df['opacity'] = np.where(is_selected, 0.9, 0.4)
+    df['label'] = [f"${p:,.0f}" for p in df['profit']]
     
-    # Assign colors
-    colors = []
-    opacities = []
-    patterns = []
+    base = alt.Chart(df).encode(
+        x=alt.X('decile:O', title='Uplift Decile (1=Lowest, 10=Highest)', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('profit:Q', title='Profit ($)')
+    )
     
-    for _, row in df.iterrows():
-        decile = row['decile']
-        profit = row['profit']
-        is_selected = decile in selected_deciles
-        
-        if not is_selected:
-            colors.append('#bdc3c7')  # Light gray for excluded
-            opacities.append(0.4)
-            patterns.append('/')
-        elif decile == 9:
-            colors.append('#e74c3c')  # Red for D9
-            opacities.append(0.9)
-            patterns.append('')
-        elif profit > 0:
-            colors.append('#27ae60')  # Green for profitable
-            opacities.append(0.9)
-            patterns.append('')
-        else:
-            colors.append('#95a5a6')  # Gray for unprofitable
-            opacities.append(0.9)
-            patterns.append('')
+    bars = base.mark_bar(stroke='white', strokeWidth=1.5).encode(
+        color=alt.Color('color:N', scale=None),
+        opacity=alt.Opacity('opacity:Q', scale=None),
+        tooltip=[
+            alt.Tooltip('decile:O', title='Decile'),
+            alt.Tooltip('profit:Q', title='Profit ($)', format=',.0f'),
+            alt.Tooltip('observed_lift:Q', title='Lift (pp)', format='.2f'),
+            alt.Tooltip('n_customers:Q', title='Customers', format=',')
+        ]
+    )
     
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=df['decile'],
-        y=df['profit'],
-        marker=dict(
-            color=colors,
-            opacity=opacities,
-            line=dict(color='white', width=1.5),
-            pattern_shape=patterns
-        ),
-        text=[f"${p:,.0f}" for p in df['profit']],
-        textposition='outside',
-        textfont=dict(size=10, color='black'),
-        hovertemplate=(
-            'Decile %{x}<br>'
-            'Profit: $%{y:,.0f}<br>'
-            'Lift: %{customdata[0]:.2f}pp<br>'
-            'Customers: %{customdata[1]:,}<extra></extra>'
-        ),
-        customdata=df[['observed_lift', 'n_customers']].values
-    ))
+    # Value labels outside the bar end
+    labels_pos = base.mark_text(baseline='bottom', dy=-3, fontSize=10, color='black').encode(
+        text='label:N'
+    ).transform_filter(alt.datum.profit >= 0)
+    labels_neg = base.mark_text(baseline='top', dy=3, fontSize=10, color='black').encode(
+        text='label:N'
+    ).transform_filter(alt.datum.profit < 0)
     
     # Break-even line
-    fig.add_hline(y=0, line_color="black", line_width=1)
+    zero = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(color='black', strokeWidth=1).encode(y='y:Q')
     
     # Annotations for D8 and D9
-    d8_row = df[df['decile'] == 8].iloc[0]
-    d9_row = df[df['decile'] == 9].iloc[0]
+    notes = []
+    d8_profit = df.loc[df['decile'] == 8, 'profit'].iloc[0]
+    d9_profit = df.loc[df['decile'] == 9, 'profit'].iloc[0]
     
-    if 8 in selected_deciles and d8_row['profit'] > 0:
-        fig.add_annotation(
-            x=8, y=d8_row['profit'],
-            text="Persuadables",
-            showarrow=True,
-            arrowhead=2,
-            arrowcolor='#27ae60',
-            font=dict(color='#27ae60', size=10),
-            yshift=30
-        )
+    if 8 in selected_deciles and d8_profit > 0:
+        notes.append({'decile': 8, 'profit': d8_profit, 'text': "Persuadables",
+                      'color': '#27ae60', 'dy': -30})
     
     if 9 in selected_deciles:
-        fig.add_annotation(
-            x=9, y=d9_row['profit'],
-            text="Loyalty Tax",
-            showarrow=True,
-            arrowhead=2,
-            arrowcolor='#e74c3c',
-            font=dict(color='#e74c3c', size=10),
-            yshift=-30 if d9_row['profit'] < 0 else 30
+        notes.append({'decile': 9, 'profit': d9_profit, 'text': "Loyalty Tax",
+                      'color': '#e74c3c', 'dy': 30 if d9_profit < 0 else -30})
+    
+    layers = [bars, labels_pos, labels_neg, zero]
+    for note in notes:
+        layers.append(
+            alt.Chart(pd.DataFrame([note])).mark_text(
+                dy=note['dy'], fontSize=10, color=note['color']
+            ).encode(x='decile:O', y='profit:Q', text='text:N')
         )
     
-    fig.update_layout(
-        title=dict(
-            text='Decile Profitability - The Loyalty Tax',
-            font=dict(size=18)
-        ),
-        xaxis_title='Uplift Decile (1=Lowest, 10=Highest)',
-        yaxis_title='Profit ($)',
-        xaxis=dict(tickmode='linear', dtick=1),
-        height=400,
-        margin=dict(t=60, b=60)
+    return alt.layer(*layers).properties(
+        title=alt.TitleParams('Decile Profitability - The Loyalty Tax', fontSize=18),
+        height=400
     )
-    
-    return fig
 
 
 def build_cumulative_chart(